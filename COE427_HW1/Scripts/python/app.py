@@ -1,16 +1,49 @@
+import collections
 import logging
 import os
+import queue
+import threading
 import time
+import tkinter as tk
+from operator import attrgetter
 import gui
 import dds_app
 
 
+# Flags for saving received files (O_BINARY only exists, and matters, on Windows)
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+
+# Received files waiting to be saved, and how many the writer thread saves per wake-up
+FILE_QUEUE_SIZE = 256
+FILE_WRITE_BATCH = 32
+
+# While the queue is full, a DDS thread re-checks every this many seconds that the writer
+# is still running, so a dead writer (or shutdown) drops files instead of hanging the thread
+FILE_QUEUE_POLL_S = 0.5
+
+# Failing to save a file is logged once, then on every Nth failure (e.g. while the disk is full)
+FILE_FAILURE_LOG_EVERY = 1000
+
+# Received messages are handed to the GUI in batches: as soon as this many are waiting,
+# otherwise after a short delay that lets a burst of samples gather in one batch
+MSG_BATCH_SIZE = 25
+MSG_FLUSH_DELAY_MS = 1
+
+# ChatUser fields in the order expected by the GUI: user, group, name, last name
+_USER_FIELDS = attrgetter("username", "group", "firstName", "lastName")
+
+# ChatMessage / FileMessage fields, decoded once per sample by the receive loops
+_MSG_FIELDS = attrgetter("toUser", "toGroup", "fromUser", "message")
+_FILE_FIELDS = attrgetter("toUser", "toGroup", "fromUser", "fileName", "mimeType", "data")
+
 
 class MainApp:
     """Main application, simple bridging between the the DDS chat application and the GUI."""
 
-    def __init__(self):
-        "Initialise the GUI and DDS application, and bind the handlers."
+    def __init__(self, preset=None):
+        """Initialise the GUI and DDS application, and bind the handlers.
+        If preset (user, group, name, last_name) is given, join the chat straight away."""
         
         # Initialise GUI and bindings
         self.gui_handlers = gui.Handlers()
@@ -31,16 +64,49 @@ class MainApp:
         self.dds_handlers.file_received = self.received_file
         self.dds_app = None
 
-        # Start the GUI
+        # Downloads directory for received files, created once and held open (where
+        # supported) so each file is created relative to it instead of by full path
+        self.downloads_dir = os.path.join(os.path.dirname(__file__), "downloads")
+        os.makedirs(self.downloads_dir, exist_ok=True)
+        self.downloads_prefix = self.downloads_dir + os.sep
+        self.downloads_fd = os.open(self.downloads_dir, _DIR_FLAGS) if os.open in os.supports_dir_fd else None
+
+        # Received files are saved by a dedicated thread, so the DDS thread never waits on the disk
+        self.file_queue = queue.Queue(maxsize=FILE_QUEUE_SIZE)
+        self.file_buffer = bytearray(dds_app.MAX_FILE_SIZE)
+        self.file_failures = 0
+        self.file_drops = 0
+        self.file_closing = False
+        self.file_writer = threading.Thread(target=self._file_writer_loop, daemon=True)
+        self.file_writer.start()
+
+        # Received messages waiting to be shown by the GUI
+        self.msg_buffer = collections.deque()
+        self.msg_flush_armed = False
+
+        # Join with the preset details, if any, then start the GUI
+        if preset:
+            self.gui.join(*preset)
         self.gui.start()
 
-        # If the GUI is closed, clean-up
+        # If the GUI is closed, clean-up (finishing any outstanding file writes)
         self.leave()
+        # Then stop the writer once it has drained the queue (unless it has already stopped)
+        while self.file_writer.is_alive():
+            try:
+                self.file_queue.put(None, timeout=FILE_QUEUE_POLL_S)
+                break
+            except queue.Full:
+                pass
+        self.file_writer.join()
+        if self.downloads_fd is not None:
+            os.close(self.downloads_fd)
     
 
     def join(self, user, group, name, last_name):
         """Join the chat with the provided details."""
 
+        self.file_closing = False
         self.dds_user = dds_app.ChatUser(username=user, group=group, firstName=name, lastName=last_name)
         self.dds_app = dds_app.DDSApp(self.dds_user, self.dds_handlers)
     
@@ -59,11 +125,19 @@ class MainApp:
     def leave(self):
         """Leave the chat and clean up the DDS application."""
 
+        # From now on files still arriving are saved but not shown, and a DDS thread waiting on
+        # a full file queue gives up, so user_leave() (called on the GUI thread) can join it
+        self.file_closing = True
+
         # Early exit if not set up previously
         if not self.dds_app:
             return
 
         self.dds_app.user_leave()
+
+        # Drop the messages still waiting for a flush (the DDS threads are stopped by now)
+        self.msg_buffer.clear()
+        self.msg_flush_armed = False
     
     
     def list_users(self):
@@ -74,25 +148,20 @@ class MainApp:
             return
 
         user_samples = self.dds_app.user_list()
-        users = [[s.username, s.group, s.firstName, s.lastName] for s in user_samples]
-        return users
+        return list(map(_USER_FIELDS, user_samples))
     
 
     def joined(self, user_samples):
-        """User joined the chat, update the GUI."""
+        """User joined the chat (called on a DDS thread), update the GUI from its event loop."""
         
-        users = [[s.username, s.group, s.firstName, s.lastName] for s in user_samples]
-        for user in users:
-            self.gui.user_joined(*user)
+        self.gui.call_soon(self.gui.users_joined, list(map(_USER_FIELDS, user_samples)))
     
 
     def left(self, user_samples):
-        """User left the chat, update the GUI."""
+        """User left the chat (called on a DDS thread), update the GUI from its event loop."""
 
-        for user in user_samples:
-            if user.username == self.dds_user.username:
-                continue
-            self.gui.user_left(user.username)
+        my_user = self.dds_user.username
+        self.gui.call_soon(self.gui.users_left, [user.username for user in user_samples if user.username != my_user])
     
 
     def send(self, destination, message):
@@ -111,79 +180,154 @@ class MainApp:
         self.dds_app.file_send(destination, file_path)
 
     def received_file(self, file_samples):
-        """FileMessage(s) received from DDS; only show those meant for this user/group."""
+        """FileMessage(s) received from DDS, already filtered down to this user/group."""
 
         if not self.dds_user:
             return
 
-        my_user = self.dds_user.username
-        my_group = self.dds_user.group
-
-        downloads_dir = os.path.join(os.path.dirname(__file__), "downloads")
-        os.makedirs(downloads_dir, exist_ok=True)
+        # Read the clock once per batch: each file gets the next millisecond, which also
+        # keeps names unique when several files with the same name arrive together
+        ts = time.time_ns() // 1_000_000
+        queue_file = self._queue_file
 
-        for s in file_samples:
+        # The DDS content filter only delivers files for me (DM), my group, or sent by me
+        for to_user, to_group, from_user, file_name, mime_type, data in map(_FILE_FIELDS, file_samples):
             # Destination string
-            dest = s.toUser or s.toGroup
+            dest = to_user or to_group
 
-            # Skip files not meant for me or my group (and that I didn't send)
-            if dest and dest not in (my_user, my_group) and s.fromUser != my_user:
-                continue
+            # Hand the file over to the writer thread, which then tells the GUI to display it
+            safe_name = from_user + "_" + str(ts) + "_" + file_name
+            ts += 1
+            if not queue_file((from_user, dest, safe_name, mime_type, data)):
+                self.file_drops += 1
+                if self.file_drops % FILE_FAILURE_LOG_EVERY == 1:
+                    logging.error(f"Dropped received file {safe_name}, the file writer has stopped ({self.file_drops} dropped so far)")
 
-            # Save the file locally
-            data_bytes = bytes(s.data)
-            ts = int(time.time() * 1000)
-            safe_name = f"{s.fromUser}_{ts}_{s.fileName}"
-            dest_path = os.path.join(downloads_dir, safe_name)
+    
+    def _queue_file(self, item):
+        """Queue a received file for the writer thread, waiting while the queue is full.
+        Returns False (the file is dropped) if the queue is still full after leaving or the writer has stopped."""
+
+        while True:
+            try:
+                self.file_queue.put(item, timeout=FILE_QUEUE_POLL_S)
+                return True
+            except queue.Full:
+                if self.file_closing or not self.file_writer.is_alive():
+                    return False
+
+
+    def _file_writer_loop(self):
+        """Dedicated thread target for saving received files to disk."""
+
+        while True:
+            # Wait for a file, then take whatever else is already queued (up to a batch)
+            batch = [self.file_queue.get()]
+            while len(batch) < FILE_WRITE_BATCH and not self.file_queue.empty():
+                batch.append(self.file_queue.get_nowait())
+
+            # None is queued on shutdown: finish the outstanding writes, the GUI is already closed
+            if batch[-1] is None:
+                for _ in self._save_files(batch[:-1]):
+                    pass
+                return
+
+            # Tell the GUI to display the saved files (inline image or clickable link)
+            # (if we left, or the window is closing or gone, the file is still saved, just not shown)
+            for from_user, dest, dest_path, mime_type in self._save_files(batch):
+                if self.file_closing:
+                    continue
+                try:
+                    self.gui.call_soon(self.gui.file_received, from_user, dest, dest_path, mime_type)
+                except (tk.TclError, RuntimeError):
+                    pass
+
+
+    def _save_files(self, pending):
+        """Write a batch of received files to disk, yielding the ones saved successfully."""
+
+        downloads_prefix = self.downloads_prefix
+        downloads_fd = self.downloads_fd
+        scratch = self.file_buffer
+
+        for from_user, dest, safe_name, mime_type, data in pending:
+            dest_path = downloads_prefix + safe_name
+
+            # Write straight from the sample's buffer if it exposes one, otherwise
+            # copy the DDS sequence into the reusable buffer (only one writer thread uses it)
+            try:
+                view = memoryview(data).cast("B")
+            except TypeError:
+                size = len(data)
+                if size <= len(scratch):
+                    scratch[:size] = data
+                    view = memoryview(scratch)[:size]
+                else:
+                    view = memoryview(bytes(data))
 
             try:
-                with open(dest_path, "wb") as f:
-                    f.write(data_bytes)
+                if downloads_fd is not None:
+                    fd = os.open(safe_name, _WRITE_FLAGS, 0o644, dir_fd=downloads_fd)
+                else:
+                    fd = os.open(dest_path, _WRITE_FLAGS, 0o644)
+                try:
+                    while view:
+                        view = view[os.write(fd, view):]
+                finally:
+                    os.close(fd)
             except Exception as e:
-                logging.exception(f"Failed to save received file {s.fileName}: {e}")
+                self.file_failures += 1
+                if self.file_failures % FILE_FAILURE_LOG_EVERY == 1:
+                    logging.error(f"Failed to save received file {safe_name} ({self.file_failures} failures so far): {e}")
                 continue
 
-            # Tell the GUI to display it (inline image or clickable link)
-            self.gui.file_received(s.fromUser, dest, dest_path, s.mimeType)
+            yield from_user, dest, dest_path, mime_type
 
 
     def received(self, message_samples):
-        """A message was received from DDS; only show those meant for this user/group."""
+        """A message was received from DDS, already filtered down to this user/group."""
 
         if not self.dds_user:
             return
 
-        my_user = self.dds_user.username
-        my_group = self.dds_user.group
+        buffer_msg = self.msg_buffer.append
 
-        for s in message_samples:
+        # The DDS content filter only delivers messages:
+        #  - to me (DM), or
+        #  - to my group, or
+        #  - sent by me.
+        for to_user, to_group, from_user, message in map(_MSG_FIELDS, message_samples):
             # Destination string – in this app toUser and toGroup carry the same value
-            dest = s.toUser or s.toGroup
+            buffer_msg((from_user, to_user or to_group, message))
 
-            # If the destination is something else (other user / other group)
-            # and I'm not the sender, skip it.
-            if dest and dest not in (my_user, my_group) and s.fromUser != my_user:
-                continue
+        # Flush right away once a full batch is waiting, otherwise arm the flush timer (once)
+        if len(self.msg_buffer) >= MSG_BATCH_SIZE:
+            self.gui.call_soon(self._flush_messages)
+        elif self.msg_buffer and not self.msg_flush_armed:
+            self.msg_flush_armed = True
+            self.gui.call_later(MSG_FLUSH_DELAY_MS, self._flush_messages)
 
-            # At this point, the message is:
-            #  - to me (DM), or
-            #  - to my group, or
-            #  - sent by me.
-            self.gui.message_received(s.fromUser, dest, s.message)
 
+    def _flush_messages(self):
+        """Hand all the buffered messages to the GUI in one call (runs on the GUI event loop)."""
 
+        # Disarm before draining, so a message buffered meanwhile re-arms the timer
+        self.msg_flush_armed = False
+        rows = [self.msg_buffer.popleft() for _ in range(len(self.msg_buffer))]
+        if rows:
+            self.gui.messages_received(rows)
 
 
 
 
-def test():
-    app = MainApp()
-    app.join("testuser", "services", "", "")
-    return app
 
 
-def main():
-    app = MainApp()
+# Details for a quick test run: main(TEST_PRESET)
+TEST_PRESET = ("testuser", "services", "", "")
+
+
+def main(preset=None):
+    app = MainApp(preset=preset)
     return app
 
 
@@ -32,10 +32,21 @@ class DDSApp:
     QOS_LIBRARY = "Chat_Library"
     QOS_PROFILE_USER = "ChatUser_Profile"
     QOS_PROFILE_MSG = "ChatMessage_Profile"
+    # Content filter for the message/file readers: the destination is toUser, or toGroup when
+    # toUser is empty, and only samples whose destination is us (%0), our group (%1) or none,
+    # or that were sent by us, are delivered
+    TOPIC_NAME_MSG_CFT = "messageFiltered"
+    TOPIC_NAME_FILE_CFT = "fileFiltered"
+    FILTER_EXPRESSION = (
+        "toUser = %0 OR toUser = %1 OR fromUser = %0"
+        " OR (toUser = '' AND (toGroup = %0 OR toGroup = %1 OR toGroup = ''))"
+    )
 
     def __init__(self, user : ChatUser, handlers=Handlers(), auto_join=True, domain_id=0):
         """Public API: create the DDS application with the provided user and handlers."""
         
+        self._check_filter_value(user.username)
+        self._check_filter_value(user.group)
         self.user = user
 
         self.message = ChatMessage()
@@ -75,11 +86,14 @@ class DDSApp:
         qos_profile_msg_str = f"{self.QOS_LIBRARY}::{self.QOS_PROFILE_MSG}"
 
         # Create publisher/subscriber for messages *before* using them
+        # Their QoS is kept, so a partition change only has to update the name
         self.pub_msg = dds.Publisher(self.participant)
-        self._set_partition(self.pub_msg, self.user.group)
+        self._pub_qos = self.pub_msg.qos
+        self._set_partition(self.pub_msg, self._pub_qos, self.user.group)
 
         self.sub_msg = dds.Subscriber(self.participant)
-        self._set_partition(self.sub_msg, self.user.group)
+        self._sub_qos = self.sub_msg.qos
+        self._set_partition(self.sub_msg, self._sub_qos, self.user.group)
 
         # DataWriter and DataReader for ChatMessage
         self.writer_msg = dds.DataWriter(
@@ -88,9 +102,16 @@ class DDSApp:
             qos=self.qos_provider.datawriter_qos_from_profile(qos_profile_msg_str),
         )
 
+        # The reader subscribes through a ContentFilteredTopic, so the destination
+        # filtering runs in the middleware before samples are handed to Python
+        self.reader_cft = dds.ContentFilteredTopic(
+            self.topic_msg,
+            self.TOPIC_NAME_MSG_CFT,
+            dds.Filter(self.FILTER_EXPRESSION, self._filter_parameters()),
+        )
         self.reader_msg = dds.DataReader(
             self.sub_msg,
-            self.topic_msg,
+            self.reader_cft,
             qos=self.qos_provider.datareader_qos_from_profile(qos_profile_msg_str),
         )
 
@@ -128,9 +149,15 @@ class DDSApp:
             qos=self.qos_provider.datawriter_qos_from_profile(qos_profile_file_str),
         )
 
+        # Same destination filtering as for the messages
+        self.reader_file_cft = dds.ContentFilteredTopic(
+            self.topic_file,
+            self.TOPIC_NAME_FILE_CFT,
+            dds.Filter(self.FILTER_EXPRESSION, self._filter_parameters()),
+        )
         self.reader_file = dds.DataReader(
             self.sub_msg,
-            self.topic_file,
+            self.reader_file_cft,
             qos=self.qos_provider.datareader_qos_from_profile(qos_profile_file_str),
         )
 
@@ -177,7 +204,7 @@ class DDSApp:
         """Monitor the FileMessage topic and invoke file_received on handlers."""
 
         while True:
-            active_conditions = self.waitset_file.wait(dds.Duration(1))
+            active_conditions = self.waitset_file.wait(dds.Duration.infinite)  # woken by new data, or the stop condition on leave
 
             for cond in active_conditions:
                 if cond == self.stop_condition:
@@ -199,6 +226,7 @@ class DDSApp:
     def user_update_group(self, group):
         """Public API: update the User group and the partition for the Message topic."""
 
+        self._check_filter_value(group)
         self.user.group = group
 
         # Unregister or dispose of the old instance
@@ -208,11 +236,12 @@ class DDSApp:
             self.writer_msg.unregister_instance(old_instance_handle)
 
         # Update the partition for the Message topic
-        self._set_partition(self.pub_msg, self.user.group)
-        self._set_partition(self.sub_msg, self.user.group)
+        self._set_partition(self.pub_msg, self._pub_qos, self.user.group)
+        self._set_partition(self.sub_msg, self._sub_qos, self.user.group)
 
-        # Update the filter parameters for the ContentFilteredTopic
-        self.reader_cft.filter_parameters = [f"'{self.user.username}'", f"'{self.user.group}'"]
+        # Update the filter parameters for the ContentFilteredTopics
+        self.reader_cft.filter_parameters = self._filter_parameters()
+        self.reader_file_cft.filter_parameters = self._filter_parameters()
         
         # Re-register the user with the new group
         self.writer_user.write(self.user)
@@ -227,15 +256,14 @@ class DDSApp:
     def message_send(self, destination, message):
         """Public API: send a text ChatMessage."""
 
-        msg = ChatMessage()
-        msg.fromUser = self.user.username
-
         # In this app we store the destination (either user or group)
         # in both toUser and toGroup; the receiver filters on it.
-        msg.toUser = destination
-        msg.toGroup = destination
-
-        msg.message = message
+        msg = ChatMessage(
+            fromUser=self.user.username,
+            toUser=destination,
+            toGroup=destination,
+            message=message,
+        )
         self.writer_msg.write(msg)
 
 
@@ -265,10 +293,28 @@ class DDSApp:
         self.participant.close()
     
 
-    def _set_partition(self, pubsub, partition_name):
-        """Private API: helper method - set partition name for a Publisher or Subscriber."""
+    def _filter_parameters(self):
+        """Private API: helper method - content filter parameters for our user (%0) and group (%1).
+        Values are quoted as-is: names containing a single quote are rejected by _check_filter_value."""
+
+        return [f"'{self.user.username}'", f"'{self.user.group}'"]
+    
+
+    @staticmethod
+    def _check_filter_value(value):
+        """Private API: helper method - reject a username/group that cannot be quoted as a filter parameter.
+        The filter's string literals have no escape for a single quote, so such names are refused
+        up front rather than escaped (the filter would otherwise fail to parse)."""
 
-        qos = pubsub.qos
+        if "'" in value:
+            raise ValueError(f"Username and group cannot contain a single quote: {value!r}")
+    
+
+    def _set_partition(self, pubsub, qos, partition_name):
+        """Private API: helper method - set partition name for a Publisher or Subscriber, given its cached QoS."""
+
+        if list(qos.partition.name) == [partition_name]:
+            return
         qos.partition.name = [partition_name]
         pubsub.qos = qos
     
@@ -277,7 +323,7 @@ class DDSApp:
         """Private API: dedicated thread target for subscribing to updates on the user topic."""
 
         while True:
-            active_conditions = self.waitset_user.wait(dds.Duration(1))
+            active_conditions = self.waitset_user.wait(dds.Duration.infinite)  # woken by new data, or the stop condition on leave
 
             for cond in active_conditions:
                 if cond == self.stop_condition:
@@ -300,7 +346,7 @@ class DDSApp:
         """Private API: dedicated thread target for updates on the ChatMessage topic."""
 
         while True:
-            active_conditions = self.waitset_msg.wait(dds.Duration(1))
+            active_conditions = self.waitset_msg.wait(dds.Duration.infinite)  # woken by new data, or the stop condition on leave
 
             for cond in active_conditions:
                 if cond == self.stop_condition:
@@ -5,10 +5,56 @@ from tkinter import messagebox
 from tkinter import filedialog
 import logging
 from typing import Callable, Optional, List
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import base64
+import bisect
 import os
+import re
 import sys
 import subprocess
 
+try:  # optional: Pillow decodes more formats and thumbnails with proper resampling
+    from PIL import Image, ImageTk
+except ImportError:
+    Image = ImageTk = None
+
+
+# Lines appended to the message board are buffered and written at most once per this interval
+MESSAGE_FLUSH_MS = 30
+
+# The message board keeps at most this many lines, dropping the oldest ones
+MAX_LINES = 5000
+# Forget the file links and images scrolled off the board after this many lines were dropped
+PRUNE_EVERY_LINES = 500
+
+# Background threads reading inline images, so large files don't stall the Tk event loop
+IMAGE_LOAD_WORKERS = 2
+
+# Inline images are shrunk to fit this many pixels per side
+IMAGE_MAX_SIZE = 320
+
+# Ctrl+Backspace deletes the word before the cursor together with the spaces following it
+_WORD_BEFORE_CURSOR = re.compile(r"[^ ]* *\Z")
+
+# File types offered by the send file dialog
+_IMAGE_PATTERNS = ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.bmp")
+_VIDEO_PATTERNS = ("*.mp4", "*.mov", "*.avi", "*.mkv")
+_FILETYPES = (
+    ("Images and videos", _IMAGE_PATTERNS + _VIDEO_PATTERNS),
+    ("Images", _IMAGE_PATTERNS),
+    ("Videos", _VIDEO_PATTERNS),
+    ("All files", "*"),
+)
+
+
+@lru_cache(maxsize=256)
+def _fullname(name, last_name) -> str:
+    """The user's full name from the optional name and last name ("" if neither is set)."""
+    return " ".join(filter(None, (name, last_name)))
+
 
 class Handlers:
     """GUIApp handlers, to be filled in by the application code where desired."""
@@ -36,16 +82,44 @@ class GuiApp:
         # GUI starts in not-joined state
         self.state_joined = False
 
+        # User and group in effect while joined (saves reading the entries on every message)
+        self._cached_user = ""
+        self._cached_group = ""
+
         # Register handlers (if any provided)
         self.handlers = handlers
 
+        # Widget changes queued by _cfg inside a (possibly nested) _batch
+        self._batch_depth = 0
+        self._batched: List[tuple] = []
+
         # Create the UI widgets
         self.widgets = _GuiWidgets(self)
 
+        # Users that joined/left while the window was hidden, summarized once it is shown again
+        self._hidden_join_count = 0
+        self._hidden_left_count = 0
+        self.root.bind("<Map>", self._on_map, add="+")
+
     def start(self):
         """Public API: start the GUI event loop."""
         self.root.mainloop()
 
+    def join(self, user, group, name: str = "", last_name: str = ""):
+        """Public API: fill in the user details and join, as if pressing the Join button."""
+        for entry, value in zip(self.widgets.entry_widgets.values(), (user, group, name, last_name)):
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        self._join()
+
+    def call_soon(self, func, *args):
+        """Public API: run func(*args) from the GUI event loop (safe to call from other threads)."""
+        self.root.after(0, func, *args)
+
+    def call_later(self, delay_ms, func, *args):
+        """Public API: run func(*args) from the GUI event loop after delay_ms milliseconds."""
+        self.root.after(delay_ms, func, *args)
+
     # -------------------------------------------------------------------------
     # Callbacks invoked by DDS / application
     # -------------------------------------------------------------------------
@@ -56,48 +130,89 @@ class GuiApp:
         - Add the user's details to the Online users list.
         - Print a message in the chat indicating user has joined.
         """
+        self.users_joined([(user, group, name, last_name)])
+
+    def users_joined(self, rows):
+        """Public API: same as user_joined for a batch of (user, group, name, last_name) rows,
+        printing all the joined messages to the board in a single update.
+        """
 
         # Early exit if not in the right state
         if not self.state_joined:
             return
-        
-        if group != self.widgets.group_entry.get():
-            return
 
-        # Add to online users - early exit if exception
-        if not self.widgets.online_users_tree.add_user(user, group, name, last_name):
-            return
+        my_group = self._cached_group
+        visible = self.root.winfo_viewable()
+        lines = []
+        with self._batch():
+            for user, group, name, last_name in rows:
+                if group != my_group:
+                    continue
+
+                # Add to online users - skip if exception
+                if not self.widgets.online_users_tree.add_user(user, group, name, last_name):
+                    continue
+                if not visible:
+                    self._hidden_join_count += 1
+                    continue
+
+                fullname = _fullname(name, last_name)
+                fullname_str = f" ({fullname})" if fullname else ""
+                lines.append(f"> {user}{fullname_str} joined on group {group}.")
 
         # Update the message board
-        space = " " if (name and last_name) else ""
-        fullname_str = f" ({name}{space}{last_name})" if (name or last_name) else ""
-        joined_str = f"> {user}{fullname_str} joined on group {group}."
-        self.widgets.message_text.append_line(joined_str)
+        if lines:
+            self.widgets.message_text.append_line("\n".join(lines))
 
     def user_left(self, user):
         """Public API: update the UI to reflect a user has left."""
+        self.users_left([user])
+
+    def users_left(self, users):
+        """Public API: same as user_left for a batch of users, in a single board update."""
         if not self.state_joined:
             return
 
-        # Remove from online users - early exit if exception
-        if not self.widgets.online_users_tree.delete_user(user):
+        # Remove from online users - skip if exception
+        with self._batch():
+            dropped = [user for user in users if self.widgets.online_users_tree.delete_user(user)]
+        if not self.root.winfo_viewable():
+            self._hidden_left_count += len(dropped)
             return
+        lines = [f"> {user} dropped." for user in dropped]
 
         # Update the message board
-        left_str = f"> {user} dropped."
-        self.widgets.message_text.append_line(left_str)
+        if lines:
+            self.widgets.message_text.append_line("\n".join(lines))
 
     def message_received(self, user, destination, message):
         """Public API: add a (received) text message to the board."""
+        self.messages_received([(user, destination, message)])
+
+    def messages_received(self, rows):
+        """Public API: add a batch of (user, destination, message) rows to the board at once."""
+
+        # Rows posted before leaving may still arrive; drop them instead of writing to the cleared board
+        if not self.state_joined:
+            return
+
+        my_user = self._cached_user
+        lines = []
+        for user, destination, message in rows:
+            dest_str = "you" if destination == my_user else destination
+            lines.append(f"{user} (to {dest_str}): {message}")
 
-        dest_str = "you" if destination == self.widgets.user_entry.get() else destination
-        fullmsg_str = f"{user} (to {dest_str}): {message}"
-        self.widgets.message_text.append_line(fullmsg_str)
+        if lines:
+            self.widgets.message_text.append_line("\n".join(lines))
 
     def file_received(self, user, destination, file_path, mime_type):
         """Public API: show a received file in the Message Board with interaction."""
 
-        dest_str = "you" if destination == self.widgets.user_entry.get() else destination
+        # A file posted before leaving may still arrive; the board has been cleared since
+        if not self.state_joined:
+            return
+
+        dest_str = "you" if destination == self._cached_user else destination
         filename = os.path.basename(file_path)
 
         if mime_type.startswith("image/"):
@@ -117,6 +232,19 @@ class GuiApp:
     # Internal GUI actions
     # -------------------------------------------------------------------------
 
+    def _on_map(self, event):
+        """Private API: print a summary of the users that joined/left while the window was hidden."""
+        if event.widget is not self.root or not (self._hidden_join_count or self._hidden_left_count):
+            return
+        summary = []
+        if self._hidden_join_count:
+            summary.append(f"{self._hidden_join_count} user(s) joined")
+        if self._hidden_left_count:
+            summary.append(f"{self._hidden_left_count} user(s) dropped")
+        self._hidden_join_count = self._hidden_left_count = 0
+        if self.state_joined:
+            self.widgets.message_text.append_line(f"> {' and '.join(summary)} while the window was hidden.")
+
     def _close(self):
         """Private API: trigger leave command (if appropriate) when closing the GUI."""
         if self.state_joined:
@@ -135,90 +263,120 @@ class GuiApp:
             error_msg = f"Please insert a {_}{__}"
             messagebox.showerror(title="Error", message=error_msg)
             return
+        # The DDS content filter cannot match names containing a single quote
+        if "'" in user or "'" in group:
+            messagebox.showerror(title="Error", message="The username and group cannot contain a single quote (').")
+            return
 
         # Update the joined state
         self.state_joined = True
+        self._cached_user = user
+        self._cached_group = group
 
         # Execute the action using details in the widgets
         kwargs = {ename: entry.get() for ename, entry in self.widgets.entry_widgets.items()}
         self.handlers.join(*kwargs.values())
 
-        # Set all entry widgets to read only
-        for entry in self.widgets.entry_widgets.values():
-            entry.config(state="readonly")
-
-        # Enable UI elements that shall not be available unless joined
-        widgets = {
-            self.widgets.group_entry: tk.NORMAL,
-            self.widgets.update_button: tk.NORMAL,
-            self.widgets.message_input: tk.NORMAL,
-            self.widgets.send_button: tk.NORMAL,
-            self.widgets.send_file_button: tk.NORMAL,
-            self.widgets.online_users_button_refresh: tk.NORMAL,
-            self.widgets.online_users_button_collapse: tk.NORMAL,
-        }
-        for widget, state in widgets.items():
-            widget.config(state=state)
-
-        # Change the button text and update its function
-        self.widgets.join_button.config(text="Leave", command=self._leave)
+        with self._batch():
+            # Set all entry widgets to read only (except the group, which can be updated),
+            # and enable UI elements that shall not be available unless joined
+            self._set_states(
+                (self.widgets.entry_widgets.values(), "readonly"),
+                ((self.widgets.group_entry, *self.widgets.interactive_widgets), tk.NORMAL),
+            )
+
+            # Change the button text and update its function
+            self._cfg(self.widgets.join_button, text="Leave", command=self._leave)
 
     def _leave(self):
         """Private API: update the UI to reflect leaving the chat and call the handler."""
 
         # Update the joined state
         self.state_joined = False
+        self._cached_user = ""
+        self._cached_group = ""
+        self._hidden_join_count = self._hidden_left_count = 0
 
         # Execute the action using details in the widgets
         self.handlers.leave()
 
-        # Set all entry widgets to normal
-        for entry in self.widgets.entry_widgets.values():
-            entry.config(state=tk.NORMAL)
+        with self._batch():
+            # Set all entry widgets to normal, and disable the UI elements only available while joined
+            self._set_states(
+                (self.widgets.entry_widgets.values(), tk.NORMAL),
+                (self.widgets.interactive_widgets, tk.DISABLED),
+            )
+
+            # Clear all online users
+            self.widgets.online_users_tree.clear_users()
 
-        # Clear all online users
-        for item in self.widgets.online_users_tree.get_children():
-            self.widgets.online_users_tree.delete(item)
+            # Clear all text from the message board
+            self.widgets.message_text.clear()
 
-        # Clear all text from the message board
-        self.widgets.message_text.clear()
+            # Change the button text and update its function
+            self._cfg(self.widgets.join_button, text="Join", command=self._join)
 
-        # Disable other UI elements that shall not be available unless joined
-        widgets = {
-            self.widgets.update_button: tk.DISABLED,
-            self.widgets.message_input: tk.DISABLED,
-            self.widgets.send_button: tk.DISABLED,
-            self.widgets.send_file_button: tk.DISABLED,
-            self.widgets.online_users_button_refresh: tk.DISABLED,
-            self.widgets.online_users_button_collapse: tk.DISABLED,
-        }
-        for widget, state in widgets.items():
-            widget.config(state=state)
+    @contextmanager
+    def _batch(self):
+        """Private API: defer the _cfg widget changes made inside, then apply them all in a single Tcl call."""
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._batched:
+                commands, self._batched = tuple(self._batched), []
+                self.root.tk.call("apply", ("commands", "foreach command $commands {{*}$command}"), commands)
+
+    def _cfg(self, widget, *command, **options):
+        """Private API: run the widget command (configure by default), deferred to the end of the current batch."""
+        args = (widget._w, *(command or ("configure",)), *widget._options(options))
+        if self._batch_depth:
+            self._batched.append(args)
+        else:
+            widget.tk.call(*args)
 
-        # Change the button text and update its function
-        self.widgets.join_button.config(text="Join", command=self._join)
+    def _set_states(self, *changes):
+        """Private API: apply (widgets, state) changes to the widgets' state in a single Tcl call."""
+        with self._batch():
+            for widgets, state in changes:
+                for widget in widgets:
+                    self._cfg(widget, state=state)
 
     def _update_user(self):
         """Private API: execute the handler to update the user group."""
         if not self.state_joined:
             return
-        self.handlers.update_user(self.widgets.group_entry.get())
+        group = self.widgets.group_entry.get()
+        if "'" in group:
+            messagebox.showerror(title="Error", message="The group cannot contain a single quote (').")
+            return
+        self._cached_group = group
+        self.handlers.update_user(self._cached_group)
 
     def _list_users(self):
         """Private API: execute the handler to get the list of users, then repopulate online users."""
         users = self.handlers.list_users()
-
-        # Clear all online users
-        for item in self.widgets.online_users_tree.get_children():
-            self.widgets.online_users_tree.delete(item)
-
-        # Add all users to online users list
-        for entry in users if users else []:
-            user = entry[0]
-            group = entry[1]
-            name = entry[2] if len(entry) > 2 else ""
-            last_name = entry[3] if len(entry) > 3 else ""
-            self.widgets.online_users_tree.add_user(user, group, name, last_name)
+        tree = self.widgets.online_users_tree
+        with self._batch():
+            # Only touch the rows that changed, rather than rebuilding the whole list
+            new_users = {entry[0]: entry for entry in (users if users else [])}
+            old_users = set(self.widgets._user_meta)
+
+            # Remove the users that are gone
+            for user in old_users - new_users.keys():
+                tree.delete_user(user)
+
+            # Add the new users, and update the group of the existing ones if it changed
+            for user, entry in new_users.items():
+                group = entry[1]
+                if user in old_users:
+                    if self.widgets._user_meta[user][0] != group:
+                        tree.add_user(user, group, "", "")  # updates the group of an existing user
+                    continue
+                name = entry[2] if len(entry) > 2 else ""
+                last_name = entry[3] if len(entry) > 3 else ""
+                tree.add_user(user, group, name, last_name)
 
     def _send_message(self):
         """Private API: send the message to selected user or group."""
@@ -231,8 +389,7 @@ class GuiApp:
             if self.widgets.online_users_tree.selection()
             else ""
         )
-        group = self.widgets.group_entry.get()
-        destination = selected_user if selected_user else group
+        destination = selected_user if selected_user else self._cached_group
 
         # Message text to send
         message = self.widgets.message_input.get()
@@ -256,8 +413,28 @@ class _GuiWidgets:
     def __init__(self, app: GuiApp):
         self.app = app
         self._image_refs: List[tk.PhotoImage] = []
-        self._file_links: dict[str, str] = {}
+        self._image_pool = ThreadPoolExecutor(max_workers=IMAGE_LOAD_WORKERS, thread_name_prefix="image_loader")
+        self._image_count = 0
+        self._pending_images: set[str] = set()  # marks of images still loading
+        self._file_links: dict[str, str] = {}  # mark at the start of each file link -> file path
+        self._file_link_count = 0
+        self._trimmed_lines = 0
+        # Mirror of the online users tree rows: O(1) membership and O(log N) insertion index
+        self._user_meta: dict[str, tuple[str, str, str]] = {}  # user -> (group, name, last_name)
+        self._user_sorted: List[str] = []
+        self._pending_lines: deque[str] = deque()
+        self._flush_scheduled = False
+        self._search_term = ""  # highlighted in new messages too, until the search is cleared
         self._create_widgets()
+        # UI elements that shall not be available unless joined
+        self.interactive_widgets = (
+            self.update_button,
+            self.message_input,
+            self.send_button,
+            self.send_file_button,
+            self.online_users_button_refresh,
+            self.online_users_button_collapse,
+        )
         self._bind_ctrl_backspace()
         self._bind_enter()
 
@@ -344,17 +521,26 @@ class _GuiWidgets:
         # Message text widget
         self.message_text = tk.Text(self.message_board_frame, height=10, width=50)
         self.message_text.config(state=tk.DISABLED)
+        self.message_text.tag_config("search_highlight", background="yellow")
+        self.message_text.tag_config("file_link", foreground="blue", underline=True)
+        self.message_text.tag_bind("file_link", "<Button-1>", self._open_file_link)
+        self._search_count = tk.StringVar(self.root)  # match lengths reported by the search
 
         def append_line(text_str: str):
-            self.message_text.config(state=tk.NORMAL)
-            self.message_text.insert(tk.END, f"{text_str}\n")
-            self.message_text.see(tk.END)
-            self.message_text.config(state=tk.DISABLED)
+            # Buffer the line; the board is updated once per flush interval
+            self._pending_lines.append(f"{text_str}\n")
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                self.root.after(MESSAGE_FLUSH_MS, self._flush_messages)
 
         def clear():
+            self._pending_lines.clear()
+            self._forget_pending_images(tk.END)  # images still loading are dropped
+            self._forget_file_links(tk.END)
             self.message_text.config(state=tk.NORMAL)
             self.message_text.delete("1.0", tk.END)
             self.message_text.config(state=tk.DISABLED)
+            self._prune_board_refs()
 
         self.message_text.append_line = append_line  # type: ignore[attr-defined]
         self.message_text.clear = clear              # type: ignore[attr-defined]
@@ -414,8 +600,11 @@ class _GuiWidgets:
 
         def collapse_cmd():
             self.online_users_button_collapse.state = not self.online_users_button_collapse.state
-            for iid in self.online_users_tree.get_children():
-                self.online_users_tree.item(iid, open=self.online_users_button_collapse.state)
+            # Expand/collapse all the users in a single Tcl call, rather than one call per user
+            tree = self.online_users_tree
+            tree.tk.eval(
+                f"foreach iid [{tree} children {{}}] {{{tree} item $iid -open {int(self.online_users_button_collapse.state)}}}"
+            )
 
         self.online_users_button_collapse = ttk.Button(
             self.online_users_label_frame, text="\u00B1", width=2
@@ -436,52 +625,58 @@ class _GuiWidgets:
         )
 
         def add_user(user, group, name, last_name):
-            users = list(self.online_users_tree.get_children())
             # Early exit if user is already in the list with the same group
-            for existing_user in users:
-                if existing_user == user:
-                    existing_group = (
-                        self.online_users_tree.item(existing_user, "text").split(" (")[-1].rstrip(")")
-                    )
-                    if existing_group == group:
-                        logging.exception(
-                            f"user {user} already exists in the list with the same group!"
-                        )
-                        return False
-                    else:
-                        # Update the group if it has changed
-                        self.online_users_tree.item(existing_user, text=f"{user} ({group})")
-                        return True
-            # Sort the new list of users so we can add the new user in the right position
-            users.append(user)
-            users.sort()
-            user_text = f"{user} ({group})"
-            self.online_users_tree.insert("", users.index(user), user, text=user_text)
-            space = " " if (name and last_name) else ""
-            fullname_str = f"{name}{space}{last_name}" if (name or last_name) else ""
+            meta = self._user_meta.get(user)
+            if meta is not None:
+                if meta[0] == group:
+                    logging.exception(f"user {user} already exists in the list with the same group!")
+                    return False
+                # Update the group if it has changed
+                self._user_meta[user] = (group,) + meta[1:]
+                self.app._cfg(self.online_users_tree, "item", user, text=f"{user} ({group})")
+                return True
+            # Find the position that keeps the list of users sorted
+            index = bisect.bisect_left(self._user_sorted, user)
+            self._user_sorted.insert(index, user)
+            self._user_meta[user] = (group, name, last_name)
+            # The tree commands go through _cfg, so inside a batch all the rows are added in one Tcl call
+            tree = self.online_users_tree
+            self.app._cfg(tree, "insert", "", index, "-id", user, text=f"{user} ({group})")
+            fullname_str = _fullname(name, last_name)
             if fullname_str:
-                self.online_users_tree.insert(user, "end", text=fullname_str)
+                self.app._cfg(tree, "insert", user, "end", text=fullname_str)
             # Expand/collapse the newly added item according to the collapse button state
-            self.online_users_tree.item(user, open=self.online_users_button_collapse.state)
+            self.app._cfg(tree, "item", user, open=self.online_users_button_collapse.state)
             return True
 
         def delete_user(user):
-            if user not in self.online_users_tree.get_children():
+            if user not in self._user_meta:
                 logging.exception(f"user {user} doesn't exist in the list!")
                 return False
-            self.online_users_tree.delete(user)
+            del self._user_meta[user]
+            del self._user_sorted[bisect.bisect_left(self._user_sorted, user)]
+            self.app._cfg(self.online_users_tree, "delete", (user,))
             return True
 
+        def clear_users():
+            if self._user_sorted:
+                self.app._cfg(self.online_users_tree, "delete", tuple(self._user_sorted))
+            self._user_meta.clear()
+            self._user_sorted.clear()
+
         self.online_users_tree.add_user = add_user  # type: ignore[attr-defined]
         self.online_users_tree.delete_user = delete_user  # type: ignore[attr-defined]
+        self.online_users_tree.clear_users = clear_users  # type: ignore[attr-defined]
 
         self.online_users_tree.heading("#0", text="User")
         self.online_users_tree.column("#0", width=200)
 
         # Only allow selecting users from the tree (not their optional details)
         self.online_users_tree.selection_prev = None
+        self.online_users_tree.selection_scheduled = False
 
-        def on_select(event):
+        def apply_selection():
+            self.online_users_tree.selection_scheduled = False
             selected_item = self.online_users_tree.selection()
             if selected_item:
                 if selected_item[0] == self.online_users_tree.selection_prev:
@@ -503,6 +698,12 @@ class _GuiWidgets:
             else:
                 self.online_users_tree.selection_prev = None
 
+        def on_select(event):
+            # Coalesce a burst of selection events into a single update once Tk is idle
+            if not self.online_users_tree.selection_scheduled:
+                self.online_users_tree.selection_scheduled = True
+                self.online_users_tree.after_idle(apply_selection)
+
         self.online_users_tree.bind("<<TreeviewSelect>>", on_select)
         self.online_users_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
@@ -512,6 +713,67 @@ class _GuiWidgets:
         self.online_users_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.online_users_tree.config(yscrollcommand=self.online_users_scrollbar.set)
 
+    # ------------------------------------------------------------------
+    # Message board
+    # ------------------------------------------------------------------
+
+    def _flush_messages(self):
+        """Write all the buffered lines to the message board in a single insert."""
+
+        # Clear the flag before draining, so a line buffered meanwhile schedules another flush
+        self._flush_scheduled = False
+        if not self._pending_lines:
+            return
+        lines = [self._pending_lines.popleft() for _ in range(len(self._pending_lines))]
+
+        at_bottom = self._at_bottom()
+        self.message_text.config(state=tk.NORMAL)
+        start = self.message_text.index("end-1c")
+        self.message_text.insert(tk.END, "".join(lines))
+        if self._search_term:
+            self._highlight_matches(start)  # only the new lines, the rest was already searched
+        self._trim_board()
+        if at_bottom:
+            self.message_text.see(tk.END)
+        self.message_text.config(state=tk.DISABLED)
+
+    def _at_bottom(self) -> bool:
+        """Whether the board is scrolled to the end, so new content should keep it scrolled there."""
+        return self.message_text.yview()[1] >= 0.999
+
+    def _trim_board(self):
+        """Drop the oldest lines once the board holds more than MAX_LINES (board must be editable)."""
+        excess = int(self.message_text.index("end-1c").split(".")[0]) - MAX_LINES
+        if excess <= 0:
+            return
+        self._forget_file_links(f"{excess + 1}.0")
+        self._forget_pending_images(f"{excess + 1}.0")
+        self.message_text.delete("1.0", f"{excess + 1}.0")
+        self._trimmed_lines += excess
+        if self._trimmed_lines >= PRUNE_EVERY_LINES:
+            self._prune_board_refs()
+
+    def _forget_file_links(self, before: str):
+        """Forget the file links starting before the given index, which is about to be deleted."""
+        while self._file_links:
+            mark = next(iter(self._file_links))  # links are kept in board order, oldest first
+            if self.message_text.compare(mark, ">=", before):
+                break
+            self.message_text.mark_unset(mark)
+            del self._file_links[mark]
+
+    def _forget_pending_images(self, before: str):
+        """Drop the images still loading whose reserved place is before the given index, which is about to be deleted."""
+        for mark in [m for m in self._pending_images if self.message_text.compare(m, "<", before)]:
+            self.message_text.mark_unset(mark)
+            self._pending_images.discard(mark)
+
+    def _prune_board_refs(self):
+        """Forget the images that are no longer on the message board."""
+        self._trimmed_lines = 0
+        live = {self.message_text.image_cget(name, "image") for name in self.message_text.image_names()}
+        self._image_refs = [img for img in self._image_refs if str(img) in live]
+
     # ------------------------------------------------------------------
     # Key bindings
     # ------------------------------------------------------------------
@@ -522,13 +784,9 @@ class _GuiWidgets:
         def delete_word(event):
             widget = event.widget
             index = widget.index(tk.INSERT)
-            text = widget.get()
             # Find the start of the word
-            while index > 0 and text[index - 1] == " ":
-                index -= 1
-            while index > 0 and text[index - 1] != " ":
-                index -= 1
-            widget.delete(index, tk.INSERT)
+            start = _WORD_BEFORE_CURSOR.search(widget.get(), 0, index).start()
+            widget.delete(start, index)
             return "break"
 
         for entry in self.entry_widgets.values():
@@ -547,29 +805,37 @@ class _GuiWidgets:
     def _search_messages(self):
         """Highlight all occurrences of the search term in the message board."""
 
-        term = self.search_entry.get().strip()
-        self.message_text.config(state=tk.NORMAL)
+        self._search_term = self.search_entry.get().strip()
         self.message_text.tag_remove("search_highlight", "1.0", tk.END)
 
-        if not term:
-            self.message_text.config(state=tk.DISABLED)
+        if not self._search_term:
             return
+        self._highlight_matches("1.0")
 
-        start_pos = "1.0"
-        while True:
-            idx = self.message_text.search(term, start_pos, tk.END, nocase=True)
-            if not idx:
-                break
+    def _highlight_matches(self, start: str):
+        """Highlight the occurrences of the current search term from start to the end of the board."""
 
-            end_pos = f"{idx}+{len(term)}c"
-            self.message_text.tag_add("search_highlight", idx, end_pos)
-            start_pos = end_pos
+        # Find every occurrence in a single Tcl call: -all returns all the start
+        # indices and -count stores the length of each match in the variable
+        text = self.message_text
+        indices = text.tk.splitlist(
+            text.tk.call(
+                text._w, "search", "-all", "-nocase", "-count", self._search_count, "--", self._search_term, start, tk.END
+            )
+        )
+        if not indices:
+            return
+        counts = text.tk.splitlist(self._search_count.get())
 
-        self.message_text.tag_config("search_highlight", background="yellow")
-        self.message_text.config(state=tk.DISABLED)
+        # Highlight all the matches with a single tag_add
+        ranges = []
+        for idx, count in zip(indices, counts):
+            ranges += (idx, f"{idx}+{count}c")
+        text.tag_add("search_highlight", *ranges)
 
     def _clear_search(self):
         """Remove all search highlights from the message board."""
+        self._search_term = ""
         self.message_text.config(state=tk.NORMAL)
         self.message_text.tag_remove("search_highlight", "1.0", tk.END)
         self.message_text.config(state=tk.DISABLED)
@@ -584,16 +850,7 @@ class _GuiWidgets:
 
         file_path = filedialog.askopenfilename(
             title="Select file to send",
-            filetypes=[
-                (
-                    "Images and videos",
-                    ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.bmp",
-                    "*.mp4", "*.mov", "*.avi", "*.mkv"),
-                ),
-                ("Images", ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.bmp")),
-                ("Videos", ("*.mp4", "*.mov", "*.avi", "*.mkv")),
-                ("All files", "*"),
-            ],
+            filetypes=_FILETYPES,
         )
         if not file_path:
             return
@@ -605,49 +862,110 @@ class _GuiWidgets:
             text = self.online_users_tree.item(sel[0], "text")
             destination = text.split(" ")[0]
         else:
-            destination = self.group_entry.get()
+            destination = self.app._cached_group
 
         self.app._send_file(destination, file_path)
 
     def insert_image(self, file_path: str):
-        """Insert an inline image into the message board."""
+        """Insert an inline image thumbnail into the message board, loading it in the background."""
+        # Reserve the image's place now, so messages arriving while it loads stay below it
+        self._image_count += 1
+        mark = f"image_{self._image_count}"
+        self._pending_images.add(mark)
+        self._flush_messages()  # keep the image after any buffered lines
+        at_bottom = self._at_bottom()
+        self.message_text.config(state=tk.NORMAL)
+        self.message_text.mark_set(mark, "end-1c")
+        self.message_text.mark_gravity(mark, tk.LEFT)
+        self.message_text.insert(tk.END, "\n")
+        if at_bottom:
+            self.message_text.see(tk.END)
+        self.message_text.config(state=tk.DISABLED)
+
+        self._image_pool.submit(self._load_image, mark, file_path)
+
+    def _load_image(self, mark: str, file_path: str):
+        """Read and thumbnail the image file (worker thread), then hand it to the Tk thread."""
         try:
-            img = tk.PhotoImage(file=file_path)
+            if Image is not None:
+                with Image.open(file_path) as im:
+                    im.thumbnail((IMAGE_MAX_SIZE, IMAGE_MAX_SIZE))
+                    data = im.copy()
+            else:
+                with open(file_path, "rb") as f:
+                    data = base64.b64encode(f.read())
         except Exception as e:
-            logging.warning(f"Could not load image {file_path}: {e}")
-            self.message_text.append_line(f"[image: {os.path.basename(file_path)}]")
-            return
+            logging.warning(f"Could not read image {file_path}: {e}")
+            data = None
+        self.root.after(0, self._finalize_image, mark, file_path, data)
+
+    def _finalize_image(self, mark: str, file_path: str, data):
+        """Create the loaded image at its reserved place on the message board."""
+        if mark not in self._pending_images:
+            return  # the board was cleared while the image was loading
+        self._pending_images.discard(mark)
 
-        self._image_refs.append(img)
+        at_bottom = self._at_bottom()
         self.message_text.config(state=tk.NORMAL)
-        self.message_text.image_create(tk.END, image=img)
-        self.message_text.insert(tk.END, "\n")
-        self.message_text.see(tk.END)
+        try:
+            if data is None:
+                raise tk.TclError("no image data")
+            img = self._thumbnail(data)
+        except tk.TclError as e:
+            logging.warning(f"Could not load image {file_path}: {e}")
+            self.message_text.insert(mark, f"[image: {os.path.basename(file_path)}]")
+        else:
+            self._image_refs.append(img)
+            self.message_text.image_create(mark, image=img)
+        self.message_text.mark_unset(mark)
+        if at_bottom:
+            self.message_text.see(tk.END)  # the image may be taller than its reserved line
         self.message_text.config(state=tk.DISABLED)
 
+    @staticmethod
+    def _thumbnail(data) -> tk.PhotoImage:
+        """Build the Tk image: from the Pillow thumbnail, else by subsampling the full-size image."""
+        if ImageTk is not None:
+            return ImageTk.PhotoImage(data)
+        img = tk.PhotoImage(data=data)
+        factor = -(-max(img.width(), img.height()) // IMAGE_MAX_SIZE)  # ceiling division
+        return img.subsample(factor) if factor > 1 else img
+
     def insert_file_link(self, label: str, file_path: str):
         """Insert clickable text that opens the file with the OS viewer."""
 
-        tag = f"file_link_{len(self._file_links)}"
-        self._file_links[tag] = file_path
-
-        def open_file(event, tag_name=tag):
-            path = self._file_links.get(tag_name)
-            if not path:
-                return
-            try:
-                if sys.platform.startswith("win"):
-                    os.startfile(path)  # type: ignore[attr-defined]
-                elif sys.platform == "darwin":
-                    subprocess.Popen(["open", path])
-                else:
-                    subprocess.Popen(["xdg-open", path])
-            except Exception as e:
-                messagebox.showerror("Open file", f"Could not open file:\n{e}")
+        # All links share the "file_link" tag; a mark at the start of each one tells its file
+        self._file_link_count += 1
+        mark = f"file_link_{self._file_link_count}"
+        self._file_links[mark] = file_path
 
+        self._flush_messages()  # keep the link after any buffered lines
+        at_bottom = self._at_bottom()
         self.message_text.config(state=tk.NORMAL)
-        self.message_text.insert(tk.END, label + "\n", (tag, "file_link_style"))
-        self.message_text.tag_config("file_link_style", foreground="blue", underline=True)
-        self.message_text.tag_bind(tag, "<Button-1>", open_file)
-        self.message_text.see(tk.END)
+        self.message_text.mark_set(mark, "end-1c")
+        self.message_text.mark_gravity(mark, tk.LEFT)
+        self.message_text.insert(tk.END, label + "\n", "file_link")
+        if at_bottom:
+            self.message_text.see(tk.END)
         self.message_text.config(state=tk.DISABLED)
+
+    def _open_file_link(self, event):
+        """Open the clicked file link with the OS viewer."""
+
+        # Find the link's mark: the closest one at or before the clicked position, on the same line
+        line_start = self.message_text.index(f"@{event.x},{event.y} linestart")
+        mark = self.message_text.mark_previous(f"{line_start} lineend")
+        while mark and mark not in self._file_links:
+            mark = self.message_text.mark_previous(mark)
+        if not mark or self.message_text.compare(mark, "<", line_start):
+            return
+        path = self._file_links[mark]
+        try:
+            if sys.platform.startswith("win"):
+                os.startfile(path)  # type: ignore[attr-defined]
+            elif sys.platform == "darwin":
+                subprocess.Popen(["open", path])
+            else:
+                subprocess.Popen(["xdg-open", path])
+        except Exception as e:
+            messagebox.showerror("Open file", f"Could not open file:\n{e}")
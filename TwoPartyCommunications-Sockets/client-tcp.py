@@ -2,8 +2,9 @@ from socket  import *
 HOST = 'localhost'
 PORT = 5000
 s = socket(AF_INET, SOCK_STREAM)
+s.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)  # send small messages without Nagle delay
 s.connect((HOST, PORT)) # connect to server (block until accepted)
-s.send('Hello, World!'.encode())  # send some data
-data = s.recv(1024)     # receive the response
+s.sendall('Hello, World!'.encode())  # send some data
+data = s.recv(65536)    # receive the response
 print(data.decode())              # print the result
 s.close()               # close the connection
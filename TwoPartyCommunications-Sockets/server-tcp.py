@@ -5,10 +5,11 @@ s = socket(AF_INET, SOCK_STREAM)
 s.bind((HOST, PORT))
 s.listen(1)
 (conn, addr) = s.accept()  # returns new socket and addr. client 
+conn.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)  # reply without Nagle delay
 print(addr, "connected")
 while True:                # forever
-  data = conn.recv(1024)   # receive data from client
+  data = conn.recv(65536)  # receive data from client
   print("received: "+data.decode())
   if not data: break       # stop if client stopped
-  conn.send((data.decode()+"*").encode()) # return sent data plus an "*"
+  conn.sendall((data.decode()+"*").encode()) # return sent data plus an "*"
 conn.close()               # close the connection